@@ -1,69 +1,119 @@
 from __future__ import annotations
 
-from collections.abc import Callable
+import asyncio
+import logging
+from collections.abc import AsyncIterator, Callable
 from typing import Any
 
-from fastapi import APIRouter, Depends, Request
+import httpx
+
+from fastapi import APIRouter, BackgroundTasks, Depends, Request
 from fastapi.responses import HTMLResponse, RedirectResponse
-from sqlmodel import Session, select
+from sqlalchemy import bindparam, or_, update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
+from .cache import clear_pages
 from .config import get_settings
 from .models import Course
 from .scan import ScanStats, scan_library
-from .udemy_thumb import best_thumbnail_for_course_title
+from .udemy_thumb import best_thumbnail_for_course_title_async, udemy_client
+
+
+log = logging.getLogger(__name__)
+
+# Parallel Udemy lookups; enough to hide latency without inviting rate limits.
+THUMB_CONCURRENCY = 8
 
 
 def build_admin_router(
     *,
     templates: Any,
     meta_func: Callable[[], dict[str, Any]],
-    get_session_dep: Callable[[], Session],
+    get_read_session_dep: Callable[[], AsyncIterator[AsyncSession]],
+    open_write_session: Callable[[], AsyncSession],
     set_scan_meta: Callable[[ScanStats], None],
 ) -> APIRouter:
     """Admin UI routes.
 
-    - Manual library scan
+    - Manual library scan (runs in the background, one at a time)
     - Optional best-effort thumbnail fetch (Udemy)
 
     Kept as a router factory so the main app can inject dependencies cleanly.
     """
 
     r = APIRouter()
+    scan_running = False
+
+    async def run_scan() -> None:
+        nonlocal scan_running
+        settings = get_settings()
+        try:
+            # Own session: the request's one is closed by the time this runs.
+            async with open_write_session() as session:
+                stats = await scan_library(session, settings.courses_dir)
+            set_scan_meta(stats)
+            await clear_pages()
+        except Exception:
+            log.exception("library scan failed (courses_dir=%s)", settings.courses_dir)
+        finally:
+            scan_running = False
 
     @r.get("/admin", response_class=HTMLResponse)
-    def admin_page(request: Request, session: Session = Depends(get_session_dep)):
+    async def admin_page(request: Request, session: AsyncSession = Depends(get_read_session_dep)):
         # Show lightweight feedback via query params.
         qp = dict(request.query_params)
         result = qp if qp else None
         return templates.TemplateResponse(request, "admin.html", {"result": result, **meta_func()})
 
     @r.post("/admin/scan")
-    def admin_scan(session: Session = Depends(get_session_dep)):
-        settings = get_settings()
-        stats = scan_library(session, settings.courses_dir)
-        set_scan_meta(stats)
-        return RedirectResponse(
-            url=f"/admin?scan=1&courses={stats.courses_seen}&lessons={stats.lessons_seen}",
-            status_code=303,
-        )
+    async def admin_scan(background: BackgroundTasks):
+        nonlocal scan_running
+        # Repeated clicks while a scan is in flight are no-ops. Check-and-set
+        # has no await in between, so it's atomic on the event loop.
+        if scan_running:
+            return RedirectResponse(url="/admin?scan=running", status_code=303)
+        scan_running = True
+        background.add_task(run_scan)
+        return RedirectResponse(url="/admin?scan=started", status_code=303)
 
     @r.post("/admin/thumbnails")
-    def admin_thumbs(session: Session = Depends(get_session_dep)):
-        courses = session.exec(select(Course).order_by(Course.title)).all()
-        updated = 0
-        attempted = 0
-        for c in courses:
-            if c.thumbnail_url:
-                continue
-            attempted += 1
-            thumb = best_thumbnail_for_course_title(c.title)
-            if thumb:
-                c.thumbnail_url = thumb
-                session.add(c)
-                updated += 1
-        session.commit()
+    async def admin_thumbs(session: AsyncSession = Depends(get_read_session_dep)):
+        # Read on the reader pool and look up with no writer connection held:
+        # the writer is shared with progress batches and scans, and the
+        # lookups can take as long as Udemy does.
+        stmt = (
+            select(Course.id, Course.title)
+            .where(or_(Course.thumbnail_url.is_(None), Course.thumbnail_url == ""))
+            .order_by(Course.title)
+        )
+        pending = (await session.exec(stmt)).all()
+        await session.close()
+        sem = asyncio.Semaphore(THUMB_CONCURRENCY)
+
+        async def fetch(client: httpx.AsyncClient, title: str) -> str | None:
+            async with sem:
+                try:
+                    return await best_thumbnail_for_course_title_async(client, title)
+                except (httpx.HTTPError, ValueError):
+                    # One blocked/rate-limited lookup (or a non-JSON block page)
+                    # shouldn't throw away the rest.
+                    log.warning("thumbnail lookup failed for %r", title, exc_info=True)
+                    return None
+
+        async with udemy_client() as client:
+            thumbs = await asyncio.gather(*(fetch(client, title) for _, title in pending))
+        rows = [{"cid": cid, "thumb": thumb} for (cid, _), thumb in zip(pending, thumbs) if thumb]
+
+        if rows:
+            set_thumb = update(Course).where(Course.id == bindparam("cid")).values(thumbnail_url=bindparam("thumb"))
+            async with open_write_session() as write:
+                conn = await write.connection()
+                await conn.execute(set_thumb, rows)
+                await write.commit()
+            await clear_pages()
         return RedirectResponse(
-            url=f"/admin?thumbs=1&attempted={attempted}&updated={updated}", status_code=303
+            url=f"/admin?thumbs=1&attempted={len(pending)}&updated={len(rows)}", status_code=303
         )
 
     return r
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import hashlib
+from functools import wraps
+from typing import Any, Awaitable, Callable
+
+from fastapi import Request, Response
+from fastapi.responses import HTMLResponse
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.inmemory import InMemoryBackend
+from fastapi_cache.coder import Coder
+
+
+# Rendered pages that only change when the library, thumbnails or progress do.
+PAGES_NAMESPACE = "pages"
+PAGES_EXPIRE_S = 60
+
+# Bumped whenever anything the pages render changes (scan, thumbnails, progress).
+# Part of every page key, so a render that raced a change is stored under a key
+# that is never read again instead of being served after the change.
+_pages_generation = 0
+
+
+class HTMLCoder(Coder):
+    """Caches a rendered page as its HTML body."""
+
+    @classmethod
+    def encode(cls, value: Any) -> bytes:
+        return bytes(value.body)
+
+    @classmethod
+    def decode(cls, value: bytes) -> Any:
+        return HTMLResponse(content=value)
+
+
+def page_key_builder(
+    func: Callable[..., Any],
+    namespace: str = "",
+    *,
+    request: Request | None = None,
+    response: Response | None = None,
+    args: tuple[Any, ...] = (),
+    kwargs: dict[str, Any] | None = None,
+) -> str:
+    # Key on the URL only; the default builder also hashes the (per-request) DB session.
+    assert request is not None
+    return f"{namespace}:{_pages_generation}:{func.__name__}:{request.url.path}?{request.url.query}"
+
+
+def init_cache() -> None:
+    FastAPICache.init(InMemoryBackend(), expire=PAGES_EXPIRE_S)
+
+
+async def clear_pages() -> None:
+    """Drop cached pages after anything they render has changed."""
+    global _pages_generation
+    _pages_generation += 1
+    await FastAPICache.clear(namespace=PAGES_NAMESPACE)
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is None:
+        return False
+    tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+    return etag.removeprefix("W/") in tags or "*" in tags
+
+
+def conditional_page(func: Callable[..., Awaitable[Response]]) -> Callable[..., Awaitable[Response]]:
+    """ETag for a page endpoint (which must take `request`).
+
+    The tag is a hash of the body actually served, so it stays correct across
+    worker processes and can't outlive the content it describes. Revalidating
+    costs a page-cache lookup (or a render) but no transfer.
+    """
+
+    @wraps(func)
+    async def inner(*args: Any, **kwargs: Any) -> Response:
+        request: Request = kwargs["request"]
+        response = await func(*args, **kwargs)
+        # Weak: GZip may serve the same page in a different encoding.
+        etag = f'W/"{hashlib.sha1(response.body).hexdigest()}"'
+        headers = {
+            "ETag": etag,
+            # Always revalidate; the validator makes that cheap.
+            "Cache-Control": "no-cache",
+        }
+        if _not_modified(request, etag):
+            return Response(status_code=304, headers=headers)
+        response.headers.update(headers)
+        return response
+
+    return inner
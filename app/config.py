@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import os
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 
 
@@ -9,9 +10,16 @@ from pathlib import Path
 class Settings:
     courses_dir: Path
     database_url: str
+    # APP_ENV=production: trade template hot-reload for cached, precompiled templates.
+    production: bool = False
 
 
+@lru_cache(maxsize=1)
 def get_settings() -> Settings:
+    """Settings read from the environment once per process.
+
+    Called on every request; use `get_settings.cache_clear()` after changing env vars.
+    """
     courses_dir_raw = os.getenv("COURSES_DIR", "").strip()
     if not courses_dir_raw:
         # Intentionally loud: app can't function without this.
@@ -21,4 +29,6 @@ def get_settings() -> Settings:
 
     database_url = os.getenv("DATABASE_URL", "sqlite:///./udemy_local.db").strip()
 
-    return Settings(courses_dir=courses_dir, database_url=database_url)
+    production = os.getenv("APP_ENV", "").strip().lower() == "production"
+
+    return Settings(courses_dir=courses_dir, database_url=database_url, production=production)
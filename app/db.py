@@ -1,25 +1,168 @@
 from __future__ import annotations
 
-from sqlmodel import SQLModel, create_engine, Session
+import os
+from collections.abc import AsyncIterator
+from urllib.parse import quote
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, StaticPool
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from .config import get_settings
 
 
-def make_engine():
+# Applied to every new SQLite connection. WAL lets page loads keep reading
+# while a scan or progress write is in flight.
+SQLITE_PRAGMAS = (
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA cache_size=-20000",
+    "PRAGMA temp_store=MEMORY",
+)
+
+# Only meaningful (or even allowed) on the read-write connection.
+SQLITE_WRITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA foreign_keys=ON",
+)
+
+READ_POOL_SIZE = 8
+
+# Indexes earlier versions created that the current schema no longer wants.
+OBSOLETE_INDEXES = (
+    "ix_lesson_course_id",
+    "ix_lesson_path",
+    "ix_lesson_section",
+    "ix_lesson_title",
+    "ix_lesson_order_key",
+    "ix_lesson_course_order",
+    "ix_progress_lesson_id",
+)
+
+
+def _async_url(url: str) -> str:
+    # Accept plain `sqlite:///...` URLs (the historical default) and run them on aiosqlite.
+    if url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + url[len("sqlite:") :]
+    return url
+
+
+def _is_memory_url(url: str) -> bool:
+    u = make_url(url)
+    return u.database in (None, "", ":memory:") or u.query.get("mode") == "memory"
+
+
+def _readonly_url(url: str) -> str:
+    """Same database opened through a `mode=ro` SQLite URI."""
+    u = make_url(url)
+    database = u.database or ""
+    # `?`, `#` and `%` are URI delimiters/escapes; a raw path containing them
+    # would silently open (and create) a different file.
+    if u.query.get("uri") != "true":
+        database = "file:" + quote(os.path.abspath(database))
+    elif not database.startswith("file:"):
+        database = "file:" + quote(database)
+    return u.set(database=database, query={**u.query, "mode": "ro", "uri": "true"}).render_as_string(
+        hide_password=False
+    )
+
+
+def make_engine(readonly: bool = False) -> AsyncEngine:
+    """Engine for the configured database.
+
+    SQLite allows a single writer at a time, so the read-write engine holds
+    exactly one connection and writers queue in the pool instead of spinning
+    on SQLITE_BUSY. The read-only engine keeps at least `READ_POOL_SIZE`
+    connections open so requests reuse them instead of reopening the
+    database (and its -wal/-shm files) each time.
+    """
     settings = get_settings()
-    connect_args = {}
-    if settings.database_url.startswith("sqlite"):
-        connect_args = {"check_same_thread": False}
-    return create_engine(settings.database_url, echo=False, connect_args=connect_args)
+    url = _async_url(settings.database_url)
+    if not url.startswith("sqlite"):
+        return create_async_engine(url, echo=False, pool_pre_ping=True, pool_recycle=3600)
+
+    kwargs = {}
+    if _is_memory_url(url):
+        # One shared connection, otherwise each checkout sees an empty database.
+        kwargs["poolclass"] = StaticPool
+    elif readonly:
+        url = _readonly_url(url)
+        kwargs.update(
+            poolclass=AsyncAdaptedQueuePool,
+            pool_size=max(READ_POOL_SIZE, os.cpu_count() or 1),
+            max_overflow=20,
+        )
+    else:
+        kwargs.update(poolclass=AsyncAdaptedQueuePool, pool_size=1, max_overflow=0)
 
+    engine = create_async_engine(
+        url,
+        echo=False,
+        pool_pre_ping=True,
+        pool_recycle=3600,
+        connect_args={"check_same_thread": False},
+        **kwargs,
+    )
+    pragmas = SQLITE_PRAGMAS if readonly else SQLITE_WRITE_PRAGMAS + SQLITE_PRAGMAS
 
-engine = make_engine()
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
 
+    return engine
 
-def init_db() -> None:
-    SQLModel.metadata.create_all(engine)
+
+def _supports_readonly(url: str) -> bool:
+    return url.startswith("sqlite") and not _is_memory_url(url)
+
+
+write_engine = make_engine()
+# An in-memory database can't be reopened read-only; readers share the writer there.
+read_engine = (
+    make_engine(readonly=True) if _supports_readonly(_async_url(get_settings().database_url)) else write_engine
+)
+
+
+def _sync_indexes(conn: Connection) -> None:
+    # create_all() skips indexes on tables that already exist, so databases
+    # from earlier versions would keep the old indexes and miss the new ones.
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+    if conn.dialect.name == "sqlite":
+        for name in OBSOLETE_INDEXES:
+            conn.exec_driver_sql(f"DROP INDEX IF EXISTS {name}")
+
+
+async def init_db() -> None:
+    async with write_engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+        await conn.run_sync(_sync_indexes)
+
+
+def _session(engine: AsyncEngine) -> AsyncSession:
+    # expire_on_commit=False: attribute access after commit must not trigger lazy IO.
+    return AsyncSession(engine, expire_on_commit=False)
+
+
+def write_session() -> AsyncSession:
+    """Session on the shared writer pool, for work outside a request (startup scan)."""
+    return _session(write_engine)
+
+
+async def get_read_session() -> AsyncIterator[AsyncSession]:
+    async with _session(read_engine) as session:
+        yield session
 
 
-def get_session():
-    with Session(engine) as session:
+async def get_write_session() -> AsyncIterator[AsyncSession]:
+    async with _session(write_engine) as session:
         yield session
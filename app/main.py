@@ -1,28 +1,61 @@
 from __future__ import annotations
 
-from collections import defaultdict
+from collections import OrderedDict
 from dataclasses import dataclass
+from itertools import groupby
 import logging
 import mimetypes
+import os
 from pathlib import Path
+import stat
+import time
 from typing import Any
 
+import anyio.to_thread
 from fastapi import Depends, FastAPI, HTTPException, Request
 from fastapi.responses import FileResponse, HTMLResponse
 from fastapi.templating import Jinja2Templates
+from fastapi_cache.decorator import cache
+from jinja2 import FileSystemBytecodeCache
 from pydantic import BaseModel, Field
-from sqlmodel import Session, select
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.types import Receive, Scope, Send
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from .admin import build_admin_router
+from .cache import PAGES_NAMESPACE, HTMLCoder, conditional_page, init_cache, page_key_builder
 from .config import get_settings
-from .db import engine, get_session, init_db
+from .db import get_read_session, init_db, write_session
 from .models import Course, Lesson, Progress
+from .progress import ProgressBatcher, ProgressUpdate
 from .scan import ScanStats, scan_library
 
 
 app = FastAPI(title="Udemy-Local")
 
+
+class PageGZipMiddleware(GZipMiddleware):
+    """GZip for pages and API responses, never for video.
+
+    Video is already compressed, and gzipping it would break Range requests.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and scope["path"].startswith("/video/"):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+app.add_middleware(PageGZipMiddleware, minimum_size=1024)
+
 templates = Jinja2Templates(directory=str(Path(__file__).parent / "templates"))
+if get_settings().production:
+    # Templates only change on deploy: skip the per-render mtime check and
+    # reuse compiled bytecode across processes/restarts.
+    templates.env.auto_reload = False
+    templates.env.bytecode_cache = FileSystemBytecodeCache()
 
 
 log = logging.getLogger(__name__)
@@ -38,22 +71,29 @@ SCAN_META = ScanMeta()
 
 
 @app.on_event("startup")
-def on_startup() -> None:
-    init_db()
+async def on_startup() -> None:
+    init_cache()
+    await init_db()
+    # Created here so its worker task lives on the serving event loop.
+    app.state.progress_batcher = ProgressBatcher(write_session)
 
     # Initial scan at app launch.
     # If it fails, we don't want to crash the whole app; admin can rescan.
     settings = get_settings()
     try:
-        from sqlmodel import Session as _Session
-
-        with _Session(bind=engine) as s:
-            stats = scan_library(s, settings.courses_dir)
+        async with write_session() as s:
+            stats = await scan_library(s, settings.courses_dir)
             _set_scan_meta(stats)
     except Exception:
         log.exception("initial library scan failed (courses_dir=%s)", settings.courses_dir)
 
 
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+    # Flush progress updates still waiting for their batch window.
+    await app.state.progress_batcher.stop()
+
+
 def meta() -> dict[str, Any]:
     settings = get_settings()
     return {
@@ -71,65 +111,79 @@ def _set_scan_meta(stats: ScanStats) -> None:
 # Admin routes (manual scan, thumbnail fetch)
 app.include_router(
     build_admin_router(
-        templates=templates, meta_func=meta, get_session_dep=get_session, set_scan_meta=_set_scan_meta
+        templates=templates,
+        meta_func=meta,
+        get_read_session_dep=get_read_session,
+        open_write_session=write_session,
+        set_scan_meta=_set_scan_meta,
     )
 )
 
 
 @app.get("/", response_class=HTMLResponse)
-def home(request: Request, q: str | None = None, session: Session = Depends(get_session)):
+@conditional_page
+async def home(request: Request, q: str | None = None, session: AsyncSession = Depends(get_read_session)):
     """Course list page."""
+    if q:
+        # Searches aren't cached; arbitrary queries would only fill the cache.
+        return await _render_home(request, session, q)
+    return await _cached_home(request=request, session=session)
+
+
+@cache(namespace=PAGES_NAMESPACE, coder=HTMLCoder, key_builder=page_key_builder)
+async def _cached_home(*, request: Request, session: AsyncSession):
+    return await _render_home(request, session, None)
+
+
+async def _render_home(request: Request, session: AsyncSession, q: str | None):
     m = meta()
 
     stmt = select(Course)
     if q:
         # Simple substring match for MVP; can upgrade to FTS later.
         stmt = stmt.where(Course.title.contains(q))
-    courses = session.exec(stmt.order_by(Course.title)).all()
+    courses = (await session.exec(stmt.order_by(Course.title))).all()
 
     return templates.TemplateResponse(request, "home.html", {"courses": courses, "q": q or "", **m})
 
 
 @app.get("/course/{course_id}", response_class=HTMLResponse)
-def course_detail(course_id: int, request: Request, session: Session = Depends(get_session)):
+@conditional_page
+@cache(namespace=PAGES_NAMESPACE, coder=HTMLCoder, key_builder=page_key_builder)
+async def course_detail(course_id: int, request: Request, session: AsyncSession = Depends(get_read_session)):
     m = meta()
 
-    course = session.get(Course, course_id)
+    course = await session.get(Course, course_id)
     if not course:
         raise HTTPException(404, "Course not found")
 
-    lessons = session.exec(
-        select(Lesson).where(Lesson.course_id == course_id).order_by(Lesson.order_key)
-    ).all()
-
-    # progress map
-    lesson_ids = [l.id for l in lessons]
-    prog_rows = []
-    if lesson_ids:
-        prog_rows = session.exec(select(Progress).where(Progress.lesson_id.in_(lesson_ids))).all()
-    prog = {p.lesson_id: p for p in prog_rows}
-
-    sections = defaultdict(list)
-    for l in lessons:
-        sections[l.section].append({"lesson": l, "progress": prog.get(l.id)})
+    # Lessons with their (optional) progress in one round trip, already in
+    # section order so the template can group them in a single pass.
+    rows = await session.exec(
+        select(Lesson, Progress)
+        .join(Progress, Progress.lesson_id == Lesson.id, isouter=True)
+        .where(Lesson.course_id == course_id)
+        .order_by(Lesson.section, Lesson.order_key)
+    )
+    sections = groupby(rows, key=lambda row: row[0].section)
 
     return templates.TemplateResponse(
         request,
         "course.html",
-        {"course": course, "sections": dict(sections), **m},
+        {"course": course, "sections": sections, **m},
     )
 
 
 @app.get("/lesson/{lesson_id}", response_class=HTMLResponse)
-def lesson_player(lesson_id: int, request: Request, session: Session = Depends(get_session)):
+async def lesson_player(lesson_id: int, request: Request, session: AsyncSession = Depends(get_read_session)):
     m = meta()
 
-    lesson = session.get(Lesson, lesson_id)
+    lesson = await session.get(Lesson, lesson_id)
     if not lesson:
         raise HTTPException(404, "Lesson not found")
 
-    course = session.get(Course, lesson.course_id)
-    progress = session.exec(select(Progress).where(Progress.lesson_id == lesson_id)).first()
+    course = await session.get(Course, lesson.course_id)
+    progress = (await session.exec(select(Progress).where(Progress.lesson_id == lesson_id))).first()
 
     return templates.TemplateResponse(
         request,
@@ -138,22 +192,53 @@ def lesson_player(lesson_id: int, request: Request, session: Session = Depends(g
     )
 
 
-@app.get("/video/{lesson_id}")
-def video_stream(lesson_id: int, session: Session = Depends(get_session)):
+# lesson_id -> (cached_at, path, stat). Video files are static, so a short-lived
+# entry lets repeated range requests (seeking, buffering) skip the DB lookup and stat.
+_VIDEO_STATS: OrderedDict[int, tuple[float, str, os.stat_result]] = OrderedDict()
+VIDEO_STAT_TTL_S = 60.0
+VIDEO_STAT_MAX = 1024
+
+
+@app.api_route("/video/{lesson_id}", methods=["GET", "HEAD"])
+async def video_stream(lesson_id: int, session: AsyncSession = Depends(get_read_session)):
     """Serves the underlying video file.
 
     FileResponse supports HTTP Range requests in Starlette, so seeking works.
     """
-    lesson = session.get(Lesson, lesson_id)
-    if not lesson:
-        raise HTTPException(404, "Lesson not found")
-
-    p = Path(lesson.path)
-    if not p.exists() or not p.is_file():
-        raise HTTPException(404, "Video file missing")
-
-    media_type, _ = mimetypes.guess_type(p.name)
-    return FileResponse(path=str(p), media_type=media_type or "application/octet-stream", filename=p.name)
+    now = time.monotonic()
+    hit = _VIDEO_STATS.get(lesson_id)
+    if hit and now - hit[0] < VIDEO_STAT_TTL_S:
+        _VIDEO_STATS.move_to_end(lesson_id)
+        _, path, st = hit
+    else:
+        lesson = await session.get(Lesson, lesson_id)
+        if not lesson:
+            raise HTTPException(404, "Lesson not found")
+
+        path = lesson.path
+        try:
+            # Off the event loop, like Starlette's own stat: libraries may live on slow mounts.
+            st = await anyio.to_thread.run_sync(os.stat, path)
+        except OSError:
+            st = None
+        if st is None or not stat.S_ISREG(st.st_mode):
+            _VIDEO_STATS.pop(lesson_id, None)
+            raise HTTPException(404, "Video file missing")
+
+        _VIDEO_STATS[lesson_id] = (now, path, st)
+        _VIDEO_STATS.move_to_end(lesson_id)
+        if len(_VIDEO_STATS) > VIDEO_STAT_MAX:
+            _VIDEO_STATS.popitem(last=False)
+
+    name = os.path.basename(path)
+    media_type, _ = mimetypes.guess_type(name)
+    # Passing stat_result skips Starlette's own stat; HEAD gets headers only.
+    return FileResponse(
+        path=path,
+        stat_result=st,
+        media_type=media_type or "application/octet-stream",
+        filename=name,
+    )
 
 
 class ProgressIn(BaseModel):
@@ -162,23 +247,19 @@ class ProgressIn(BaseModel):
 
 
 @app.post("/api/progress/{lesson_id}")
-def upsert_progress(lesson_id: int, payload: ProgressIn, session: Session = Depends(get_session)):
-    lesson = session.get(Lesson, lesson_id)
+async def upsert_progress(
+    lesson_id: int, payload: ProgressIn, request: Request, session: AsyncSession = Depends(get_read_session)
+):
+    lesson = await session.get(Lesson, lesson_id)
     if not lesson:
         raise HTTPException(404, "Lesson not found")
 
-    position = float(payload.position_seconds or 0.0)
-    completed = bool(payload.completed)
-
-    prog = session.exec(select(Progress).where(Progress.lesson_id == lesson_id)).first()
-    if not prog:
-        prog = Progress(lesson_id=lesson_id, position_seconds=position, completed=completed)
-    else:
-        # Don't un-complete a lesson unless explicitly asked.
-        prog.position_seconds = max(0.0, position)
-        if completed:
-            prog.completed = True
-
-    session.add(prog)
-    session.commit()
+    # Resolves once the batch holding this update has been committed.
+    await request.app.state.progress_batcher.process(
+        ProgressUpdate(
+            lesson_id=lesson_id,
+            position_seconds=float(payload.position_seconds or 0.0),
+            completed=bool(payload.completed),
+        )
+    )
     return {"ok": True}
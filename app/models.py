@@ -3,7 +3,7 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Optional
 
-from sqlmodel import SQLModel, Field, UniqueConstraint
+from sqlmodel import SQLModel, Field, Index, UniqueConstraint
 
 
 class Course(SQLModel, table=True):
@@ -25,27 +25,34 @@ class Course(SQLModel, table=True):
 class Lesson(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
 
-    course_id: int = Field(index=True, nullable=False)
+    # Indexed via ix_lesson_course_section_order below.
+    course_id: int = Field(nullable=False)
 
     # Absolute path to the video file (unique)
-    path: str = Field(index=True, nullable=False)
+    path: str = Field(nullable=False)
 
-    section: str = Field(index=True, nullable=False)
-    title: str = Field(index=True, nullable=False)
+    section: str = Field(nullable=False)
+    title: str = Field(nullable=False)
 
     # Sort key within course
-    order_key: str = Field(index=True, nullable=False)
+    order_key: str = Field(nullable=False)
 
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
-    __table_args__ = (UniqueConstraint("path"),)
+    # The course page filters on course_id and sorts by section, order_key;
+    # one composite index serves both.
+    __table_args__ = (
+        UniqueConstraint("path"),
+        Index("ix_lesson_course_section_order", "course_id", "section", "order_key"),
+    )
 
 
 class Progress(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
 
-    lesson_id: int = Field(index=True, nullable=False)
+    # Indexed by the unique constraint below.
+    lesson_id: int = Field(nullable=False)
 
     # Single-user MVP: last playback position
     position_seconds: float = Field(default=0.0, nullable=False)
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime
+
+from async_batcher.batcher import AsyncBatcher
+from sqlalchemy import or_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from .cache import clear_pages
+from .models import Progress
+
+
+# How long an update may wait for others to share its commit.
+PROGRESS_BATCH_WINDOW_S = 0.2
+# Rows per INSERT; keeps the statement well under SQLite's bound-parameter limit.
+PROGRESS_BATCH_MAX = 500
+
+
+@dataclass
+class ProgressUpdate:
+    lesson_id: int
+    position_seconds: float
+    completed: bool
+
+
+class ProgressBatcher(AsyncBatcher[ProgressUpdate, None]):
+    """Coalesces progress POSTs into one upsert + commit per batch window.
+
+    Every open player reports its position every few seconds; without
+    batching each report costs its own transaction (and WAL fsync).
+    """
+
+    def __init__(self, open_session: Callable[[], AsyncSession]) -> None:
+        super().__init__(max_batch_size=PROGRESS_BATCH_MAX, max_queue_time=PROGRESS_BATCH_WINDOW_S)
+        self._open_session = open_session
+
+    async def process_batch(self, batch: list[ProgressUpdate]) -> None:
+        # Last reported position wins; a lesson completed anywhere in the batch stays completed.
+        rows: dict[int, dict] = {}
+        for u in batch:
+            prev = rows.get(u.lesson_id)
+            rows[u.lesson_id] = {
+                "lesson_id": u.lesson_id,
+                "position_seconds": max(0.0, u.position_seconds),
+                "completed": u.completed or bool(prev and prev["completed"]),
+                "updated_at": datetime.utcnow(),
+            }
+
+        stmt = sqlite_insert(Progress).values(list(rows.values()))
+        excluded = stmt.excluded
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Progress.lesson_id],
+            set_={
+                "position_seconds": excluded.position_seconds,
+                # Don't un-complete a lesson unless explicitly asked.
+                "completed": or_(Progress.completed, excluded.completed),
+                "updated_at": excluded.updated_at,
+            },
+        )
+        async with self._open_session() as session:
+            await session.exec(stmt)
+            await session.commit()
+        await clear_pages()
@@ -1,17 +1,25 @@
 from __future__ import annotations
 
+import asyncio
+import os
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable
+from typing import Any, Iterable, Iterator
 
-from sqlmodel import Session, select
+from sqlalchemy import or_, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from .models import Course, Lesson
-from .utils import natural_key
+from .utils import chunks, natural_key
 
 
 VIDEO_EXTS = {".mp4", ".mkv", ".webm", ".mov", ".m4v"}
 
+# Rows per multi-row INSERT; keeps each statement well under SQLite's bound-parameter limit.
+UPSERT_CHUNK_SIZE = 500
+
 
 @dataclass
 class ScanStats:
@@ -19,99 +27,158 @@ class ScanStats:
     lessons_seen: int = 0
 
 
-def iter_video_files(course_dir: Path) -> Iterable[tuple[str, Path]]:
+def _walk_videos(dir_path: str) -> Iterator[tuple[str, os.DirEntry[str]]]:
+    try:
+        with os.scandir(dir_path) as it:
+            entries = list(it)
+    except PermissionError:
+        return
+
+    section = os.path.basename(dir_path)
+    videos = [e for e in entries if os.path.splitext(e.name)[1].lower() in VIDEO_EXTS and e.is_file()]
+    videos.sort(key=lambda e: natural_key(e.name))
+    for e in videos:
+        yield section, e
+
+    subdirs = [e for e in entries if e.is_dir(follow_symlinks=False)]
+    subdirs.sort(key=lambda e: natural_key(e.name))
+    for d in subdirs:
+        yield from _walk_videos(d.path)
+
+
+def iter_video_files(course_dir: Path) -> Iterable[tuple[str, os.DirEntry[str]]]:
     # Expect: course_dir/section_dir/video_file
     # Also tolerate deeper nesting: we keep section as immediate parent folder name.
-    for p in sorted(course_dir.rglob("*"), key=lambda x: natural_key(str(x))):
-        if not p.is_file():
-            continue
-        if p.suffix.lower() not in VIDEO_EXTS:
-            continue
-        section = p.parent.name
-        yield section, p
-
-
-def upsert_course(session: Session, course_dir: Path) -> Course:
-    course_path = str(course_dir.resolve())
-    title = course_dir.name
-
-    existing = session.exec(select(Course).where(Course.path == course_path)).first()
-    if existing:
-        if existing.title != title:
-            existing.title = title
-        return existing
-
-    course = Course(path=course_path, title=title)
-    session.add(course)
-    session.flush()  # assign id
-    return course
-
-
-def upsert_lesson(
-    session: Session,
-    course_id: int,
-    section: str,
-    video_path: Path,
-    order_key: str,
-) -> Lesson:
-    path_str = str(video_path.resolve())
-    title = video_path.stem
-
-    existing = session.exec(select(Lesson).where(Lesson.path == path_str)).first()
-    if existing:
-        changed = False
-        if existing.course_id != course_id:
-            existing.course_id = course_id
-            changed = True
-        if existing.section != section:
-            existing.section = section
-            changed = True
-        if existing.title != title:
-            existing.title = title
-            changed = True
-        if existing.order_key != order_key:
-            existing.order_key = order_key
-            changed = True
-        if changed:
-            session.add(existing)
-        return existing
-
-    lesson = Lesson(
-        course_id=course_id,
-        path=path_str,
-        section=section,
-        title=title,
-        order_key=order_key,
-    )
-    session.add(lesson)
-    return lesson
+    # Only video files are stat'ed; within a folder its videos come first, then
+    # its subfolders, each in natural order.
+    return _walk_videos(os.fspath(course_dir))
 
 
-def scan_library(session: Session, courses_dir: Path) -> ScanStats:
-    stats = ScanStats()
+def _walk_library(courses_dir: Path) -> list[tuple[dict[str, Any], list[dict[str, Any]]]]:
+    """Blocking filesystem part of a scan.
 
+    Returns `(course_row, lesson_rows)` pairs in display order; lesson rows
+    get their `course_id` once the course has been upserted.
+    """
     if not courses_dir.exists() or not courses_dir.is_dir():
-        return stats
+        return []
 
     course_dirs = [p for p in courses_dir.iterdir() if p.is_dir()]
     course_dirs.sort(key=lambda p: natural_key(p.name))
 
+    library = []
     for course_dir in course_dirs:
-        stats.courses_seen += 1
-        course = upsert_course(session, course_dir)
-
-        # Upsert lessons
-        for section, video_path in iter_video_files(course_dir):
-            stats.lessons_seen += 1
+        course_str = os.fspath(course_dir)
+        # Resolve once per course. The walk never descends into symlinked
+        # folders, so below it only symlinked files need resolving again.
+        course_real = os.path.realpath(course_str)
+        lesson_rows = []
+        for section, entry in iter_video_files(course_dir):
             # Order key: relative path within the course, good enough for stable ordering.
-            rel = video_path.relative_to(course_dir)
-            upsert_lesson(
-                session=session,
-                course_id=course.id,
-                section=section,
-                video_path=video_path,
-                order_key=str(rel),
+            rel = entry.path[len(course_str) + 1 :]
+            lesson_rows.append(
+                {
+                    "path": os.path.realpath(entry.path) if entry.is_symlink() else os.path.join(course_real, rel),
+                    "section": section,
+                    "title": os.path.splitext(entry.name)[0],
+                    "order_key": rel,
+                }
             )
+        library.append(({"path": course_real, "title": course_dir.name}, lesson_rows))
+    return library
+
+
+async def upsert_courses(session: AsyncSession, rows: list[dict[str, Any]]) -> dict[str, int]:
+    """Insert or rename courses in bulk; returns `{path: course_id}`."""
+    ids: dict[str, int] = {}
+    for chunk in chunks(rows, UPSERT_CHUNK_SIZE):
+        stmt = sqlite_insert(Course).values(list(chunk))
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Course.path],
+            set_={"title": stmt.excluded.title},
+        ).returning(Course.id, Course.path)
+        for course_id, path in await session.exec(stmt):
+            ids[path] = course_id
+    return ids
+
+
+async def upsert_lessons(session: AsyncSession, rows: list[dict[str, Any]]) -> None:
+    """Insert new lessons and update moved/renamed ones in bulk.
+
+    One prepared statement run through the driver's executemany(): no
+    per-chunk SQL compilation and no bound-parameter limit to stay under.
+    """
+    if not rows:
+        return
+
+    stmt = sqlite_insert(Lesson.__table__)
+    excluded = stmt.excluded
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Lesson.path],
+        set_={
+            "course_id": excluded.course_id,
+            "section": excluded.section,
+            "title": excluded.title,
+            "order_key": excluded.order_key,
+        },
+        # Leave unchanged rows alone instead of rewriting every page on a rescan.
+        where=or_(
+            Lesson.course_id != excluded.course_id,
+            Lesson.section != excluded.section,
+            Lesson.title != excluded.title,
+            Lesson.order_key != excluded.order_key,
+        ),
+    )
+    conn = await session.connection()
+    await conn.execute(stmt, rows)
+
+
+async def scan_library(session: AsyncSession, courses_dir: Path) -> ScanStats:
+    """Sync the DB with the courses directory in a single write transaction.
+
+    `session` must not have a transaction in progress.
+    """
+    stats = ScanStats()
+
+    # Directory walking is plain blocking IO; keep it off the event loop.
+    # Done before touching the DB so the write lock isn't held meanwhile.
+    library = await asyncio.to_thread(_walk_library, courses_dir)
+
+    # Take SQLite's write lock up front: all reads and writes below share one
+    # transaction (and one commit/fsync), and a concurrent writer makes us
+    # wait here (busy_timeout) instead of failing halfway with SQLITE_BUSY.
+    await session.exec(text("BEGIN IMMEDIATE"))
+
+    # Load what we already know once, so unchanged courses/lessons (the common
+    # case on a rescan) never reach the database again.
+    course_ids: dict[str, int] = {}
+    course_titles: dict[str, str] = {}
+    for path, course_id, title in await session.exec(select(Course.path, Course.id, Course.title)):
+        course_ids[path] = course_id
+        course_titles[path] = title
+    known_lessons = {
+        path: (course_id, section, title, order_key)
+        for path, course_id, section, title, order_key in await session.exec(
+            select(Lesson.path, Lesson.course_id, Lesson.section, Lesson.title, Lesson.order_key)
+        )
+    }
+
+    changed_courses = [
+        course_row for course_row, _ in library if course_titles.get(course_row["path"]) != course_row["title"]
+    ]
+    course_ids.update(await upsert_courses(session, changed_courses))
+
+    changed_lessons = []
+    for course_row, rows in library:
+        course_id = course_ids[course_row["path"]]
+        for row in rows:
+            stats.lessons_seen += 1
+            row["course_id"] = course_id
+            if known_lessons.get(row["path"]) != (course_id, row["section"], row["title"], row["order_key"]):
+                changed_lessons.append(row)
+    await upsert_lessons(session, changed_lessons)
+
+    stats.courses_seen = len(library)
 
-    session.commit()
+    await session.commit()
     return stats
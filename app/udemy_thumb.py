@@ -19,6 +19,12 @@ class UdemyCandidate:
 
 _UDEMY_API = "https://www.udemy.com/api-2.0/courses/"
 
+_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) Udemy-Local/0.1",
+    "Accept": "application/json,text/plain,*/*",
+    "Referer": "https://www.udemy.com/",
+}
+
 
 def _clean(s: str) -> str:
     s = s.strip()
@@ -26,7 +32,12 @@ def _clean(s: str) -> str:
     return s
 
 
-def search_udemy_candidates(query: str, limit: int = 5, timeout_s: float = 10.0) -> list[UdemyCandidate]:
+def udemy_client(timeout_s: float = 10.0) -> httpx.AsyncClient:
+    """Client to share across many lookups (one connection pool, one TLS handshake)."""
+    return httpx.AsyncClient(follow_redirects=True, timeout=timeout_s, headers=_HEADERS)
+
+
+async def search_udemy_candidates(client: httpx.AsyncClient, query: str, limit: int = 5) -> list[UdemyCandidate]:
     """Best-effort Udemy search.
 
     Notes:
@@ -45,17 +56,10 @@ def search_udemy_candidates(query: str, limit: int = 5, timeout_s: float = 10.0)
         "fields[course]": "title,url,image_480x270,image_240x135,image_125_H",
     }
 
-    headers = {
-        "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) Udemy-Local/0.1",
-        "Accept": "application/json,text/plain,*/*",
-        "Referer": "https://www.udemy.com/",
-    }
-
     out: list[UdemyCandidate] = []
-    with httpx.Client(follow_redirects=True, timeout=timeout_s, headers=headers) as client:
-        r = client.get(_UDEMY_API, params=params)
-        r.raise_for_status()
-        data = r.json()
+    r = await client.get(_UDEMY_API, params=params)
+    r.raise_for_status()
+    data = r.json()
 
     results = data.get("results") or []
     for item in results:
@@ -77,8 +81,8 @@ def search_udemy_candidates(query: str, limit: int = 5, timeout_s: float = 10.0)
     return out[:limit]
 
 
-def best_thumbnail_for_course_title(title: str) -> Optional[str]:
-    candidates = search_udemy_candidates(title, limit=5)
+async def best_thumbnail_for_course_title_async(client: httpx.AsyncClient, title: str) -> Optional[str]:
+    candidates = await search_udemy_candidates(client, title, limit=5)
     if not candidates:
         return None
 
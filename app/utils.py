@@ -1,8 +1,25 @@
 from __future__ import annotations
 
 import re
+from collections.abc import Iterator, Sequence
+from functools import lru_cache
+from typing import TypeVar
 
+T = TypeVar("T")
 
-def natural_key(s: str):
-    """Sort key that treats digit runs as integers ("2" < "10")."""
-    return [int(t) if t.isdigit() else t.lower() for t in re.split(r"(\d+)", s)]
+_DIGITS = re.compile(r"(\d+)")
+
+
+@lru_cache(maxsize=100_000)
+def natural_key(s: str) -> tuple[int | str, ...]:
+    """Sort key that treats digit runs as integers ("2" < "10").
+
+    Cached: rescans sort the same folder/file names over and over.
+    """
+    return tuple(int(t) if t.isdigit() else t.lower() for t in _DIGITS.split(s))
+
+
+def chunks(items: Sequence[T], size: int) -> Iterator[Sequence[T]]:
+    """Consecutive slices of at most `size` items."""
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import asyncio
+import os
+from pathlib import Path
+
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models import Course, Lesson
+from app.scan import scan_library
+
+
+def _touch(path: Path) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"")
+    return path
+
+
+async def _scan(db_path: Path, courses_dir: Path) -> tuple[set[str], set[str]]:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.create_all)
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            await scan_library(session, courses_dir)
+            courses = set((await session.exec(select(Course.path))).all())
+            lessons = set((await session.exec(select(Lesson.path))).all())
+        return courses, lessons
+    finally:
+        await engine.dispose()
+
+
+def test_scan_paths_match_path_resolve_with_symlinks(tmp_path: Path) -> None:
+    # Library reached through a symlink...
+    real_lib = tmp_path / "real_lib"
+    courses_dir = tmp_path / "lib"
+    real_lib.mkdir()
+    os.symlink(real_lib, courses_dir)
+
+    # ...a plain course with one regular and one symlinked video...
+    _touch(real_lib / "Course 1" / "Section 1" / "01 Intro.mp4")
+    elsewhere = _touch(tmp_path / "elsewhere" / "shared.mp4")
+    os.symlink(elsewhere, real_lib / "Course 1" / "Section 1" / "02 Shared.mp4")
+
+    # ...and a course folder that is itself a symlink.
+    stored = tmp_path / "store" / "Course 2 real"
+    _touch(stored / "Section A" / "a.mkv")
+    _touch(stored / "Section A" / "Nested" / "b.mp4")
+    os.symlink(stored, real_lib / "Course 2")
+
+    # What the previous Path.resolve()-per-file scan stored.
+    course_dirs = [p for p in courses_dir.iterdir() if p.is_dir()]
+    expected_courses = {str(p.resolve()) for p in course_dirs}
+    expected_lessons = {
+        str(v.resolve())
+        for p in course_dirs
+        for v in [
+            p / "Section 1" / "01 Intro.mp4",
+            p / "Section 1" / "02 Shared.mp4",
+            p / "Section A" / "a.mkv",
+            p / "Section A" / "Nested" / "b.mp4",
+        ]
+        if v.exists()
+    }
+    assert len(expected_lessons) == 4
+    assert str(elsewhere.resolve()) in expected_lessons
+
+    courses, lessons = asyncio.run(_scan(tmp_path / "db.sqlite", courses_dir))
+
+    assert courses == expected_courses
+    assert lessons == expected_lessons